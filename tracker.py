@@ -1,12 +1,34 @@
 from datetime import datetime
+import asyncio
 import pytz
-import pandas as pd
 import gspread
-import time
+from gspread.urls import SPREADSHEET_VALUES_BATCH_UPDATE_URL
+from gspread.utils import a1_range_to_grid_range, absolute_range_name, fill_gaps
 import os
-import json
+import sys
+import logging
+import time
+import atexit
+import shutil
+import subprocess
+import hashlib
+import fcntl
+import argparse
+import diskcache
 import re
-from bs4 import BeautifulSoup
+import random
+import operator
+import queue
+import threading
+import multiprocessing
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import reduce, lru_cache
+from urllib.parse import urlparse
+import httpx
+from curl_cffi import requests as cffi_requests
+import orjson
+from selectolax.lexbor import LexborHTMLParser as HTMLParser
 from oauth2client.service_account import ServiceAccountCredentials
 from dotenv import load_dotenv
 
@@ -18,15 +40,146 @@ from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 
 # Load environment variables
 load_dotenv()
 
+# One line per event on stdout; arguments are only formatted if the level is on
+logger = logging.getLogger("pricebot")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
 # --- CONFIGURATION ---
 SHEET_NAME = "Price Tracker 2026"
 GOOGLE_CREDENTIALS_JSON = os.getenv("GOOGLE_CREDENTIALS_JSON")
-def get_driver():
-    """Sets up a Stealthy Chrome browser with Referer spoofing."""
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+# Rotated per plain-HTTP request
+USER_AGENTS = [
+    USER_AGENT,
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0",
+]
+HTTP_TIMEOUT = httpx.Timeout(15, connect=5)   # (connect, read) limits in seconds
+HTTP_RETRIES = 2       # Retries on connection failures (DNS, refused, TLS)
+# Sites that block ordinary HTTP clients by TLS fingerprint; fetched as Chrome
+IMPERSONATE_RE = re.compile(r"amazon|flipkart")
+MAX_CONCURRENCY = 16   # Pages fetched at once over plain HTTP
+HOST_DELAY = 1         # Seconds between two hits on the same domain
+DRIVER_POOL_SIZE = 3   # Headless Chromes scraping in parallel (~300 MB each)
+PROCESS_PARSE_MIN_BYTES = 50 * 1024   # Smaller pages parse faster than a process round trip
+CACHE_DIR = os.path.expanduser(os.getenv("PRICE_TRACKER_CACHE", "~/.cache/price-tracker"))
+SELECTOR_CACHE_FILE = os.path.join(CACHE_DIR, "selector_cache.json")
+SELECTOR_CACHE_TTL = 24 * 3600   # Forget a winning selector after a day without hits
+PRICE_CACHE_DIR = os.path.join(CACHE_DIR, "prices")
+PRICE_CACHE_TTL = 6 * 3600   # Reuse a scraped price for 6 hours unless --force
+CHROMEDRIVER_CACHE = os.path.join(CACHE_DIR, "chromedriver")
+CHROMEDRIVER_MAX_AGE = 7 * 24 * 3600   # Re-check for a newer chromedriver weekly
+CHROMEDRIVER_VERSION_FILE = CHROMEDRIVER_CACHE + ".version"   # Chrome major it was fetched for
+CHROME_PROFILE_DIR = os.path.join(CACHE_DIR, "chrome-profiles")   # One kept profile per pool slot
+CHROME_DISK_CACHE_SIZE = 256 * 1024 * 1024   # HTTP cache per profile (shared JS of repeat sites)
+
+# Sub-resources the browser never needs to read a price
+BLOCKED_URLS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.woff*", "*.mp4", "*.css",
+    "*googletagmanager*", "*google-analytics*", "*/gtm.js", "*/analytics*", "*doubleclick*", "*facebook.net*",
+]
+
+# Domain -> whether its plain HTML carries the price (filled in as we go)
+STATIC_HOSTS = {}
+
+# Domain -> (script index, JSON path) that last held the JSON-LD price
+POINTING = {}
+
+# URL -> {"etag", "modified", "digest"} seen on this run's fetch, saved with the price
+VALIDATORS = {}
+
+# Competitor sheet: (url column, product name column, platform label)
+COMPETITOR_COLUMNS = [(4, 2, "Amazon"), (7, 5, "Flipkart"), (10, 8, "Blinkit"), (13, 11, "other")]
+# Scrape results that mean "no price"; the previous sheet value is kept instead
+FAILED_PRICES = frozenset({"Blocked by Website", "Out of Stock / Error", "Error", "Timeout"})
+EMPTY_CELLS = frozenset({"", "Not Available"})
+
+_CHROME_VERSION_RE = re.compile(r"(\d+)\.\d+")
+
+def _chrome_major():
+    """Returns the installed Chrome's major version ("124"), or None if not found."""
+    for binary in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser"):
+        try:
+            out = subprocess.check_output([binary, "--version"], stderr=subprocess.DEVNULL, timeout=10, text=True)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        m = _CHROME_VERSION_RE.search(out)
+        if m:
+            return m.group(1)
+    return None
+
+def _cached_install():
+    """Returns a chromedriver binary, downloading only when the cached copy is stale.
+
+    The cached copy is stale after CHROMEDRIVER_MAX_AGE, or as soon as Chrome
+    itself moves to a new major version.
+    """
+    major = _chrome_major()
+    if os.path.exists(CHROMEDRIVER_CACHE):
+        try:
+            with open(CHROMEDRIVER_VERSION_FILE) as f:
+                cached_major = f.read().strip() or None
+        except OSError:
+            cached_major = None
+        fresh = time.time() - os.path.getmtime(CHROMEDRIVER_CACHE) < CHROMEDRIVER_MAX_AGE
+        if fresh and (major is None or major == cached_major):
+            return CHROMEDRIVER_CACHE
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Copy beside the cache and rename over it: another run may be executing
+    # the old binary, and must never see a half-written one
+    tmp = f"{CHROMEDRIVER_CACHE}.{os.getpid()}.tmp"
+    shutil.copy(ChromeDriverManager().install(), tmp)
+    os.replace(tmp, CHROMEDRIVER_CACHE)
+    with open(tmp, "w") as f:
+        f.write(major or "")
+    os.replace(tmp, CHROMEDRIVER_VERSION_FILE)
+    return CHROMEDRIVER_CACHE
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+def get_chromedriver_path():
+    """Resolves the chromedriver binary once per process."""
+    global _chromedriver_path
+    # The pool threads start browsers at the same time
+    with _chromedriver_lock:
+        if _chromedriver_path is None:
+            _chromedriver_path = os.getenv("CHROMEDRIVER_PATH") or _cached_install()
+    return _chromedriver_path
+
+def lock_profile(profile):
+    """Locks a profile dir for this process. Returns the lock file, or None if another run holds it.
+
+    The lock is an OS file lock, so it goes away with the process even if
+    that process crashes; close the file to release it earlier.
+    """
+    os.makedirs(CHROME_PROFILE_DIR, exist_ok=True)
+    f = open(os.path.join(CHROME_PROFILE_DIR, f"{profile}.lock"), "w")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def get_driver(profile=None):
+    """Sets up a Stealthy Chrome browser with Referer spoofing.
+
+    profile names a persistent user data dir under CHROME_PROFILE_DIR, so
+    the HTTP cache survives between runs. Chrome locks a profile, so each
+    browser running at the same time needs its own.
+    """
     chrome_options = Options()
 
     # --- STEALTH SETTINGS ---
@@ -40,13 +193,30 @@ def get_driver():
     
  
     # Fake User Agent
-    user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-    chrome_options.add_argument(f"user-agent={user_agent}")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
     
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option("useAutomationExtension", False)
 
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    # --- SPEED SETTINGS ---
+    # The price is in the HTML/JS; images, CSS, plugins and popups are dead weight
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+        "profile.managed_default_content_settings.plugins": 2,
+        "profile.managed_default_content_settings.popups": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.add_argument("--disable-sync")
+    chrome_options.add_argument("--disable-translate")
+    chrome_options.add_argument("--disable-extensions")
+    if profile:
+        chrome_options.add_argument(f"--user-data-dir={os.path.join(CHROME_PROFILE_DIR, profile)}")
+    chrome_options.add_argument(f"--disk-cache-size={CHROME_DISK_CACHE_SIZE}")
+
+    driver = webdriver.Chrome(service=Service(get_chromedriver_path()), options=chrome_options)
     driver.set_page_load_timeout(30)
     driver.set_script_timeout(30)
     
@@ -58,42 +228,262 @@ def get_driver():
             })
         """
     })
+
+    # Skip images, fonts, media and trackers; no CSS animations
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    driver.execute_cdp_cmd("Emulation.setEmulatedMedia", {
+        "features": [{"name": "prefers-reduced-motion", "value": "reduce"}]
+    })
     
     return driver
 
+_PRICE_NUMBER = re.compile(r"\d[\d,.]*")
+
 def clean_price(text):
     """Extracts numbers from price text."""
     if not text: return None
-    # Remove everything except digits and dots
-    clean = "".join([c for c in str(text) if c.isdigit() or c == '.'])
-    if clean:
-        try:
-            val = float(clean)
-            return f"₹{val:.2f}"
-        except:
-            return text
+    # Take the first number only, so "Rs. 1,299" does not become ".1299"
+    match = _PRICE_NUMBER.search(str(text))
+    if not match: return None
+
+    # The match is only digits, commas and dots: dropping commas is enough
+    clean = match.group().replace(",", "").rstrip(".")
+    # "1.299.00" -> only the last dot is the decimal point
+    if clean.count(".") > 1:
+        whole, _, decimals = clean.rpartition(".")
+        clean = whole.replace(".", "") + "." + decimals
+    try:
+        return f"₹{float(clean):.2f}"
+    except ValueError:
+        return text
+
+def _offer_price(data):
+    """Finds the offer price in one parsed JSON-LD block.
+
+    Returns (json_path, price) or None.
+    """
+    path = ()
+    if isinstance(data, list): data, path = data[0], (0,)
+
+    if 'offers' in data:
+        offer, path = data['offers'], path + ('offers',)
+        if isinstance(offer, list): offer, path = offer[0], path + (0,)
+        for key in ('price', 'lowPrice'):
+            if key in offer: return path + (key,), str(offer[key])
     return None
 
-def get_smart_price(soup):
-    """Checks JSON-LD (Hidden Data) for Price."""
-    scripts = soup.find_all('script', type='application/ld+json')
-    for script in scripts:
+# JSON-LD blocks are cut straight out of the raw page, no DOM needed
+_LDJSON_RE = re.compile(rb'<script[^>]*application/ld\+json[^>]*>(.*?)</script>', re.S | re.I)
+# Cheap pre-check: blocks without a price key (breadcrumbs, org info) aren't decoded
+_PRICE_KEY_RE = re.compile(rb'"(?:low)?[Pp]rice"\s*:')
+
+def get_smart_price(raw, hint=None):
+    """Checks JSON-LD (Hidden Data) for Price.
+
+    raw is the page as bytes. hint is a (script index, JSON path) that
+    found the price on this site before; it is tried first. Returns
+    (price, hint) for the script that held the price, or (None, None).
+    """
+    scripts = [m.group(1) for m in _LDJSON_RE.finditer(raw)]
+    if hint:
+        index, path = hint
         try:
-            if not script.string: continue
-            data = json.loads(script.string)
-            if isinstance(data, list): data = data[0]
-            
-            if 'offers' in data:
-                offer = data['offers']
-                if isinstance(offer, list): offer = offer[0]
-                if 'price' in offer: return str(offer['price'])
-                if 'lowPrice' in offer: return str(offer['lowPrice'])
-        except:
+            price = reduce(operator.getitem, path, orjson.loads(scripts[index]))
+            if price: return str(price), hint
+        except Exception:
+            pass
+
+    for index, script in enumerate(scripts):
+        if not _PRICE_KEY_RE.search(script):
             continue
+        try:
+            found = _offer_price(orjson.loads(script))
+        except Exception:
+            continue
+        if found and found[1]:
+            path, price = found
+            return price, (index, path)
+    return None, None
+
+# --- PLATFORM RULES ---
+# Anything without its own wait target waits for any element showing a '₹'
+RUPEE_LOCATOR = (By.XPATH, "//*[contains(text(),'₹')]")
+
+@dataclass(frozen=True)
+class SiteRule:
+    """Everything platform-specific about reading a price."""
+    css: tuple                     # CSS selectors tried in order on the parsed page
+    wait: tuple = RUPEE_LOCATOR    # Browser locator that means the price has rendered
+    lazy_load: bool = False        # Price only renders after scrolling
+    needs_js: bool = False         # A plain-HTTP miss goes to the browser
+
+# Keyed by the name that appears in the site's host.
+# ':lexbor-contains' matches elements whose text contains the given string.
+SITE_RULES = {
+    "amazon": SiteRule(
+        css=("span.a-price span.a-offscreen", "span.a-price-whole", "#priceblock_ourprice", "#priceblock_dealprice"),
+        wait=(By.CSS_SELECTOR, "span.a-price, #priceblock_ourprice, #priceblock_dealprice"),
+    ),
+    "flipkart": SiteRule(
+        css=("div.Nx9bqj.CxhGGd", "div.Nx9bqj", "div._30jeq3._16Jk6d", "div._30jeq3"),
+        wait=(By.CSS_SELECTOR, "div.Nx9bqj, div._30jeq3"),
+    ),
+    "1mg": SiteRule(
+        css=("[class*='PriceBoxPlanOption__offer-price']", "[class*='DrugPriceBox__best-price']", "[class*='PriceDetails__discount-div']"),
+        wait=(By.CSS_SELECTOR, "[class*='PriceBoxPlanOption__offer-price'], [class*='DrugPriceBox__best-price']"),
+    ),
+    "jiomart": SiteRule(css=("#price_section .jm-heading-xs", ".product-price .jm-heading-xs")),
+    "moglix": SiteRule(css=("[class*='pdp-price'] .price", "[class*='selling-price']")),
+    "meesho": SiteRule(
+        css=("h4:lexbor-contains('₹')",),
+        wait=(By.XPATH, "//h4[contains(text(),'₹')]"),
+        lazy_load=True, needs_js=True,
+    ),
+    # Snapdeal often uses 'Rs.' instead of '₹'
+    "snapdeal": SiteRule(css=(".payBlkBig", ".pdp-final-price"), wait=(By.CSS_SELECTOR, ".payBlkBig, .pdp-final-price")),
+    "blinkit": SiteRule(
+        css=("span:lexbor-contains('₹')", "div[class*='price']"),
+        wait=(By.XPATH, "//span[contains(text(),'₹')]"),
+        lazy_load=True, needs_js=True,
+    ),
+}
+DEFAULT_RULE = SiteRule(css=())
+PLATFORM_RE = re.compile("(" + "|".join(SITE_RULES) + ")")
+
+@lru_cache(maxsize=None)
+def _match_host(host):
+    """Returns the SITE_RULES key for a host, or None (memoised per host)."""
+    m = PLATFORM_RE.search(host)
+    return m.group(1) if m else None
+
+def _detect(url):
+    """Returns the SITE_RULES key for a URL, or None."""
+    return _match_host(urlparse(url).netloc)
+
+def _rule(url):
+    """Returns the SiteRule for a URL (DEFAULT_RULE for unknown sites)."""
+    return SITE_RULES.get(_detect(url), DEFAULT_RULE)
+
+# --- SELECTOR CACHE ---
+# "host|platform" -> {"order": selectors, winners first, "hit": last hit time}
+# Kept across runs so the selector that worked last time is tried first.
+def load_selector_cache():
+    try:
+        with open(SELECTOR_CACHE_FILE, "rb") as f:
+            cache = orjson.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    now = time.time()
+    return {key: entry for key, entry in cache.items() if now - entry["hit"] < SELECTOR_CACHE_TTL}
+
+SELECTOR_CACHE = load_selector_cache()
+_selector_cache_dirty = False
+
+def save_selector_cache():
+    if not _selector_cache_dirty:
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(SELECTOR_CACHE_FILE, "wb") as f:
+        f.write(orjson.dumps(SELECTOR_CACHE))
+
+atexit.register(save_selector_cache)
+
+def _selector_order(key, selectors):
+    entry = SELECTOR_CACHE.get(key)
+    if not entry:
+        return selectors
+    known = [s for s in entry["order"] if s in selectors]
+    return known + [s for s in selectors if s not in known]
+
+def _remember(url, hint, selector):
+    """Records the JSON-LD hint or CSS selector that found a price on this site."""
+    global _selector_cache_dirty
+    host = urlparse(url).netloc
+    if hint:
+        POINTING[host] = hint
+    if selector:
+        platform = _detect(url)
+        key = f"{host}|{platform}"
+        order = _selector_order(key, SITE_RULES[platform].css)
+        SELECTOR_CACHE[key] = {"order": [selector] + [s for s in order if s != selector], "hit": time.time()}
+        _selector_cache_dirty = True
+
+def _site_hints(url):
+    """Returns what found prices on this URL's site before: (JSON-LD hint, selector order)."""
+    host = urlparse(url).netloc
+    platform = _detect(url)
+    order = _selector_order(f"{host}|{platform}", SITE_RULES[platform].css) if platform else None
+    return POINTING.get(host), order
+
+# --- PAGE PARSING ---
+# One element's text, short and starting with a price, e.g. "₹ 1,299"
+_RUPEE_TEXT_RE = re.compile(r"₹\s?[\d,]+")
+RUPEE_TEXT_MAX = 15   # Longer text is a sentence or a whole block, not a price
+
+def _rupee_element_text(node):
+    """Text of the deepest element, from node upwards, that reads like a price.
+
+    Catches prices split over several text nodes, e.g. "<b>₹</b>1,299" or
+    React's "₹<!-- -->499".
+    """
+    while node is not None:
+        text = node.text(strip=True)
+        if len(text) >= RUPEE_TEXT_MAX:
+            return None
+        if _RUPEE_TEXT_RE.match(text):
+            return text
+        node = node.parent
     return None
 
+def parse_price(raw, url, hint=None, order=None):
+    """Finds the price text in a raw page, browser or plain HTTP alike.
+
+    Tries JSON-LD first (from hint), then the platform's CSS selectors
+    (in order), then any text that looks like a price. Top-level and
+    side-effect free so it can run in a worker process. Returns
+    (price_text, hint, selector) where hint/selector is whichever found
+    the price.
+    """
+    # 1. Try JSON-LD (Best for Meesho/Snapdeal)
+    price_text, hint = get_smart_price(raw, hint)
+    if price_text:
+        return price_text, hint, None
+
+    # 2. Platform Specific Selectors (only now build the DOM)
+    tree = HTMLParser(raw)
+    platform = _detect(url)
+    if platform:
+        # css_first stops at the first match, so the usual case
+        # (the first selector hits) never walks the whole page
+        for selector in order or SITE_RULES[platform].css:
+            node = tree.css_first(selector)
+            if node:
+                text = node.text(strip=True)
+                if text: return text, None, selector
+
+    # 3. Any short element whose text starts with '₹'
+    # This bypasses class name changes completely
+    tree.strip_tags(["script", "style"])
+    for node in tree.css("*:lexbor-contains('₹')"):
+        text = _rupee_element_text(node)
+        if text: return text, None, None
+    return None, None, None
+
+def _wait_for_price(driver, url, timeout=8):
+    """Waits until the page has JSON-LD or the site's price element, whichever comes first."""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.2).until(EC.any_of(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "script[type='application/ld+json']")),
+            EC.presence_of_element_located(_rule(url).wait),
+        ))
+    except TimeoutException:
+        pass
+
+_UNSAFE_NAME_RE = re.compile(r'\W+')
+
 def get_price(driver, url, product_name="Unknown"):
-    """Navigates to URL, Scrolls, and Scrapes with Debugging."""
+    """Navigates to URL, Scrolls on lazy-load sites, and Scrapes with Debugging."""
     if not isinstance(url, str) or "http" not in url:
         return "Not Available"
 
@@ -101,229 +491,493 @@ def get_price(driver, url, product_name="Unknown"):
         try:
             driver.get(url)
         except Exception:
-            print("Page load timeout — skipping")
+            logger.warning("Page load timeout, skipping %s", url)
             return "Timeout"
                 
-        # SCROLL LOGIC (Triggers Lazy Load)
-        driver.execute_script("window.scrollBy(0, 500);")
-        time.sleep(2)
-        driver.execute_script("window.scrollBy(0, 500);")
-        time.sleep(3) 
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        price_text = None
-        
-        # 1. Try JSON-LD (Best for Meesho/Snapdeal)
-        price_text = get_smart_price(soup)
-
-        # 2. Try XPath Text Search (If JSON fails)
-        if not price_text:
-            try:
-                # Look for ANY header or span containing '₹'
-                # This bypasses class name changes completely
-                xpath_query = "//*[contains(text(), '₹') and string-length(text()) < 15]"
-                elements = driver.find_elements(By.XPATH, xpath_query)
-                
-                for el in elements:
-                    txt = el.text.strip()
-                    # Filter out garbage, keep realistic prices
-                    if re.match(r"₹\s?[\d,]+", txt):
-                        price_text = txt
-                        break
-            except:
-                pass
+        # SCROLL LOGIC (Triggers Lazy Load) - only where the site needs it
+        if _rule(url).lazy_load:
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
+
+        _wait_for_price(driver, url)
+
+        # JSON-LD usually sits in <head>: try that small slice before
+        # pulling the whole page. (No hint here, its script index counts
+        # from the top of the full page.)
+        head = driver.execute_script("return document.head ? document.head.outerHTML : '';")
+        price_text, _ = get_smart_price(head.encode()) if head else (None, None)
 
-        # 3. Platform Specific Fallbacks
+        # JSON-LD, Platform Specific Selectors, then any '₹' text, all read
+        # from the one page_source snapshot (no per-element WebDriver calls)
         if not price_text:
-            if "snapdeal" in url:
-                # Snapdeal often uses 'Rs.' instead of '₹'
-                try:
-                    el = driver.find_element(By.CLASS_NAME, "payBlkBig")
-                    price_text = el.text
-                except:
-                    try:
-                        el = driver.find_element(By.CLASS_NAME, "pdp-final-price")
-                        price_text = el.text
-                    except: pass
-
-            elif "meesho" in url:
-                 # Meesho Fallback
-                 try:
-                     el = driver.find_element(By.XPATH, "//h4[contains(text(), '₹')]")
-                     price_text = el.text
-                 except: pass
-            elif "blinkit" in url:
-                try:
-                    el = driver.find_element(By.XPATH, "//span[contains(text(),'₹')]")
-                    price_text = el.text
-                except:
-                    try:
-                        el = driver.find_element(By.CSS_SELECTOR, "div[class*='price']")
-                        price_text = el.text
-                    except:
-                        pass
+            raw = driver.page_source.encode()
+            if len(raw) >= PROCESS_PARSE_MIN_BYTES:
+                # Off the GIL, so the other browser threads keep going meanwhile
+                price_text, hint, selector = get_process_pool().submit(parse_price, raw, url, *_site_hints(url)).result()
+            else:
+                price_text, hint, selector = parse_price(raw, url, *_site_hints(url))
+            _remember(url, hint, selector)
 
         # --- DEBUG: TAKE SCREENSHOT IF FAILED ---
         if not price_text:
-            print(f"      [DEBUG] Failed to find price for {product_name}. Taking screenshot...")
-            safe_name = re.sub(r'\W+', '_', product_name)[:15]
+            safe_name = _UNSAFE_NAME_RE.sub('_', product_name)[:15]
+            logger.debug("No price for %s, saving error_%s.png", product_name, safe_name)
             driver.save_screenshot(f"error_{safe_name}.png")
             
             # Check Page Title for Blocking
             if "Access Denied" in driver.title or "Robot" in driver.title:
                 return "Blocked by Website"
 
-        return clean_price(price_text) if price_text else "Out of Stock / Error"
+        # Text without a number (e.g. "Currently unavailable") cleans to None
+        return (clean_price(price_text) if price_text else None) or "Out of Stock / Error"
 
     except Exception as e:
-        print(f"Error scraping {url}: {e}")
+        logger.warning("Error scraping %s: %s", url, e)
         return "Error"
 
-def main():
-    print("Bot: Starting Driver...")
-    driver = get_driver()
+# --- STATIC (NO-BROWSER) SCRAPING ---
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool():
+    """Worker processes for parsing large pages outside the GIL."""
+    global _process_pool
+    # The browser threads may ask for it at the same time
+    with _process_pool_lock:
+        if _process_pool is None:
+            # spawn, not fork: the parent already runs threads at this point
+            _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_process_pool.shutdown)
+    return _process_pool
+
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.S | re.I)
+
+# Captcha forms served with a normal title, e.g. Amazon's "Amazon.in" captcha page
+_CAPTCHA_RE = re.compile(rb"/errors/validateCaptcha|g-recaptcha|h-captcha|cf-challenge|Are you a human", re.I)
+
+def _is_blocked(raw):
+    """True if the page is a bot check rather than the product page."""
+    m = _TITLE_RE.search(raw)
+    if m and (b"Access Denied" in m.group(1) or b"Robot" in m.group(1)):
+        return True
+    return bool(_CAPTCHA_RE.search(raw))
+
+def _conditional_headers(entry):
+    """If-None-Match / If-Modified-Since for a cached entry, so unchanged pages come back as 304."""
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("modified"):
+        headers["If-Modified-Since"] = entry["modified"]
+    return headers
+
+async def fetch(client, url, extra_headers=None):
+    """Downloads a page over plain HTTP. Returns the response or None on failure."""
+    try:
+        headers = {"User-Agent": random.choice(USER_AGENTS), "Accept-Language": "en-IN,en;q=0.9"}
+        headers.update(extra_headers or {})
+        return await client.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+    except httpx.HTTPError:
+        return None
+
+async def fetch_impersonated(session, url, extra_headers=None):
+    """Downloads a page with Chrome's TLS/HTTP2 fingerprint. Returns the response or None."""
+    try:
+        # No User-Agent override: it has to match the impersonated browser
+        headers = {"Accept-Language": "en-IN,en;q=0.9"}
+        headers.update(extra_headers or {})
+        return await session.get(url, headers=headers, timeout=(5, 15))
+    except cffi_requests.RequestsError:
+        return None
+
+async def _scrape_one(client, session, url, semaphore, host_locks, entry=None):
+    # One lock per domain keeps us polite to each site without
+    # slowing down requests to the other sites.
+    try:
+        host = urlparse(url).netloc
+        host_lock = host_locks.setdefault(host, asyncio.Lock())
+        async with host_lock:
+            # This site only serves prices to a browser, go straight there
+            if STATIC_HOSTS.get(host) is False:
+                return None
+
+            async with semaphore:
+                conditional = _conditional_headers(entry)
+                if IMPERSONATE_RE.search(host):
+                    resp = await fetch_impersonated(session, url, conditional)
+                else:
+                    resp = await fetch(client, url, conditional)
+
+            raw = None
+            price = None
+            if resp is not None and resp.status_code == 304 and entry:
+                # Server says nothing changed since the cached price
+                price = entry["price"]
+                VALIDATORS[url] = {k: entry.get(k) for k in ("etag", "modified", "digest")}
+            elif resp is not None and resp.status_code == 200:
+                raw = resp.content
+                VALIDATORS[url] = {
+                    "etag": resp.headers.get("etag"),
+                    "modified": resp.headers.get("last-modified"),
+                    "digest": hashlib.blake2b(raw, digest_size=16).hexdigest(),
+                }
+                if entry and entry.get("digest") == VALIDATORS[url]["digest"]:
+                    # Same bytes as last time: reuse the price without parsing
+                    price = entry["price"]
+                    raw = None
+
+            # A 200 page that is a bot check, or a JS site's page without a
+            # price, means plain HTTP won't work for this site at all.
+            # Network errors and other statuses only affect this one URL.
+            browser_only = False
+            if raw is not None and _is_blocked(raw):
+                browser_only = True
+            elif raw is not None:
+                # Parsing is CPU work, keep it off the event loop. Big pages go
+                # to another core; small ones stay on a thread (no pickling).
+                loop = asyncio.get_running_loop()
+                executor = get_process_pool() if len(raw) >= PROCESS_PARSE_MIN_BYTES else None
+                price_text, hint, selector = await loop.run_in_executor(executor, parse_price, raw, url, *_site_hints(url))
+                _remember(url, hint, selector)
+                if price_text:
+                    # Text without a number (e.g. "Currently unavailable") cleans to None
+                    price = clean_price(price_text) or "Out of Stock / Error"
+                elif IMPERSONATE_RE.search(host):
+                    # These sites serve bot checks that look like normal
+                    # pages; let the browser take a look at this one
+                    pass
+                elif not _rule(url).needs_js:
+                    # The page came through fine and has no price: the browser
+                    # would see the same thing, so don't send it there.
+                    price = "Out of Stock / Error"
+                else:
+                    browser_only = True
+            if price is not None:
+                STATIC_HOSTS[host] = True
+            else:
+                # The browser will price it: these validators describe a JS
+                # shell or bot check, not the page the price comes from
+                VALIDATORS.pop(url, None)
+                if browser_only:
+                    STATIC_HOSTS.setdefault(host, False)
+
+            await asyncio.sleep(HOST_DELAY)
+        return price
+    except Exception as e:
+        # One bad link or failed parse must not take the other URLs down
+        logger.warning("Error scraping %s: %s", url, e)
+        VALIDATORS.pop(url, None)
+        return "Error"
+
+async def _scrape_all(urls, entries=None):
+    """Fetches all URLs concurrently. Returns {url: price, or None if it needs the browser}.
+
+    entries are expired price-cache entries; their validators make the fetch conditional.
+    """
+    if not urls:
+        return {}
+    entries = entries or {}
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    host_locks = {}
+    # One pooled transport for the whole run: repeat hits to the same
+    # site reuse the open connection instead of a new TLS handshake.
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+        retries=HTTP_RETRIES,
+    )
+    async with httpx.AsyncClient(transport=transport, follow_redirects=True) as client, \
+            cffi_requests.AsyncSession(impersonate="chrome", max_clients=MAX_CONCURRENCY) as session:
+        prices = await asyncio.gather(*[_scrape_one(client, session, url, semaphore, host_locks, entries.get(url))
+                                        for url in urls])
+    return dict(zip(urls, prices))
+
+# --- BROWSER POOL ---
+class DriverPool:
+    """Up to size browsers shared by the scraping threads.
+
+    Browsers start on first use, so a run that plain HTTP covers entirely
+    never launches Chrome, and a few pending pages launch only a few.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE):
+        self.size = size
+        self._drivers = queue.Queue()
+        # Profile slots with no browser; each running Chrome locks its own
+        self._free_slots = list(range(size))
+        self._profile_locks = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        """Takes a free browser, starting a new one while a slot is free."""
+        with self._lock:
+            slot = self._free_slots.pop(0) if self._drivers.empty() and self._free_slots else None
+        if slot is None:
+            return self._drivers.get()
+        logger.info("Starting browser %d", slot)
+        profile = f"profile-{slot}"
+        # An overlapping run may still have this profile open: use a
+        # throwaway one then rather than failing to start
+        profile_lock = lock_profile(profile)
+        if profile_lock is None:
+            logger.info("Profile %s in use by another run, starting with a temporary one", profile)
+            profile = None
+        try:
+            driver = get_driver(profile)
+        except Exception:
+            if profile_lock:
+                profile_lock.close()
+            with self._lock:
+                self._free_slots.append(slot)
+            raise
+        if profile_lock:
+            with self._lock:
+                self._profile_locks.append(profile_lock)
+        return driver
+
+    def get_price(self, url, product_name):
+        """Scrapes one page on whichever browser is free."""
+        driver = self._acquire()
+        try:
+            logger.debug("Scraping %s with browser", product_name)
+            return get_price(driver, url, product_name)
+        finally:
+            # Drop every site's cookies (not just the current page's), so
+            # the next page starts without a session, without restarting Chrome
+            try:
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except Exception:
+                pass
+            self._drivers.put(driver)
+
+    def quit(self):
+        while not self._drivers.empty():
+            self._drivers.get().quit()
+        while self._profile_locks:
+            self._profile_locks.pop().close()
+
+# --- PRICE CACHE ---
+_price_cache = None
+
+def get_price_cache():
+    """On-disk cache of recently scraped prices, shared across runs."""
+    global _price_cache
+    if _price_cache is None:
+        _price_cache = diskcache.Cache(PRICE_CACHE_DIR, size_limit=100 * 1024 * 1024)
+    return _price_cache
+
+def _cache_key(url):
+    return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
+def cached_entries(urls):
+    """Returns {url: cache entry} for every cached URL, fresh or expired."""
+    cache = get_price_cache()
+    entries = {}
+    for url in urls:
+        hit = cache.get(_cache_key(url))
+        if hit:
+            entries[url] = hit
+    return entries
+
+def store_prices(prices):
+    """Caches the prices that were actually scraped (not error markers)."""
+    cache = get_price_cache()
+    now = time.time()
+    for url, price in prices.items():
+        if price and price.startswith("₹"):
+            cache.set(_cache_key(url), {"price": price, "ts": now, **VALIDATORS.get(url, {})})
+
+def scrape_prices(drivers, jobs, force=False):
+    """Scrapes (url, product_name) jobs: cache first, then plain HTTP, then browsers.
+
+    Prices younger than PRICE_CACHE_TTL are used as is; older ones are
+    revalidated with a conditional GET and kept if the page hasn't changed.
+    force skips the cache lookup (fresh prices are still stored).
+    """
+    urls = list(dict.fromkeys(url for url, _ in jobs))
+    entries = {} if force else cached_entries(urls)
+    now = time.time()
+    prices = {url: e["price"] for url, e in entries.items() if now - e["ts"] < PRICE_CACHE_TTL}
+    todo = [url for url in urls if url not in prices]
+    logger.info("%d prices from cache, fetching %d pages over HTTP", len(prices), len(todo))
+    scraped = asyncio.run(_scrape_all(todo, entries))
+
+    pending = {}
+    for url, product_name in jobs:
+        if url in scraped and scraped[url] is None:
+            pending.setdefault(url, product_name)
+
+    if pending:
+        logger.info("Scraping %d pages with the browser", len(pending))
+        with ThreadPoolExecutor(max_workers=drivers.size) as pool:
+            futures = {url: pool.submit(drivers.get_price, url, product_name)
+                       for url, product_name in pending.items()}
+        for url, future in futures.items():
+            try:
+                scraped[url] = future.result()
+            except Exception as e:
+                # A browser that fails to start costs this page, not the run
+                logger.warning("Browser failed for %s: %s", url, e)
+                scraped[url] = "Error"
+
+    store_prices(scraped)
+    prices.update(scraped)
+    return prices
+
+# --- GOOGLE SHEETS ---
+HEADER_FORMAT = {
+    "backgroundColor": {"red": 0.0, "green": 0.2, "blue": 0.6},
+    "textFormat": {"foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}, "bold": True}
+}
+PRODUCT_FORMAT = {"backgroundColor": {"red": 0.95, "green": 0.95, "blue": 0.95}}
+
+def format_request(sheet, a1_range, cell_format):
+    """Builds a batchUpdate request applying cell_format to a range."""
+    return {"repeatCell": {
+        "range": a1_range_to_grid_range(a1_range, sheet.id),
+        "cell": {"userEnteredFormat": cell_format},
+        "fields": "userEnteredFormat(" + ",".join(cell_format) + ")",
+    }}
+
+def clear_request(sheet):
+    """Builds a batchUpdate request emptying every cell value of a tab."""
+    return {"updateCells": {"range": {"sheetId": sheet.id}, "fields": "userEnteredValue"}}
+
+def read_tabs(spreadsheet, titles):
+    """Reads whole tabs with one values.batchGet. Returns a list of rows per title.
+
+    Rows are padded to the same width, like Worksheet.get_all_values().
+    """
+    resp = spreadsheet.values_batch_get([absolute_range_name(title) for title in titles])
+    tabs = [r.get("values", []) for r in resp["valueRanges"]]
+    return [fill_gaps(rows) if rows else [] for rows in tabs]
+
+def write_values(spreadsheet, blocks):
+    """Writes [(sheet, values)] blocks, each starting at A1, in a single API call."""
+    # Same request as spreadsheet.values_batch_update, but the body is
+    # serialised by orjson in one C call instead of stdlib json.
+    body = {
+        "valueInputOption": "RAW",
+        "data": [{"range": absolute_range_name(sheet.title, "A1"), "values": values} for sheet, values in blocks],
+    }
+    spreadsheet.client.request(
+        "post", SPREADSHEET_VALUES_BATCH_UPDATE_URL % spreadsheet.id,
+        data=orjson.dumps(body),
+        headers={"Content-Type": "application/json"},
+    )
+
+# Browser pool kept alive between main(keep_driver=True) calls
+_drivers = None
+
+def main(keep_driver=False, force=False):
+    """Runs one scrape round.
+
+    With keep_driver, the browsers stay up for the next round. With force,
+    every page is scraped again instead of reusing cached prices.
+    """
+    global _drivers
+    drivers = _drivers or DriverPool()
     ist = pytz.timezone("Asia/Kolkata")
     fetch_time = datetime.now(ist).strftime("%Y-%m-%d %H:%M:%S")
     
     try:
-        print("Bot: Reading Cimexis Product URLs...")
+        logger.info("Reading Cimexis product URLs")
 
      
         scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
         if GOOGLE_CREDENTIALS_JSON:
-            creds_dict = json.loads(GOOGLE_CREDENTIALS_JSON)
+            creds_dict = orjson.loads(GOOGLE_CREDENTIALS_JSON)
             creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
         else:
             creds = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
 
         client = gspread.authorize(creds)
-        product_sheet = client.open(SHEET_NAME).worksheet("Cimexis Product List")
-        product_data = product_sheet.get_all_values()
-        price_sheet = client.open(SHEET_NAME).worksheet("Cimexis Price Tracker 2026")
-        existing_data = price_sheet.get_all_values()
-        existing_df = None
-        if len(existing_data) > 1:
-            existing_df = pd.DataFrame(existing_data[1:], columns=existing_data[0])
-        df = pd.DataFrame(product_data[1:], columns=product_data[0])
+        # Open the spreadsheet once and look up all its tabs in one call
+        spreadsheet = client.open(SHEET_NAME)
+        sheets = {sheet.title: sheet for sheet in spreadsheet.worksheets()}
+        price_sheet = sheets["Cimexis Price Tracker 2026"]
+        product_data, existing_data, comp_data = read_tabs(
+            spreadsheet, ["Cimexis Product List", "Cimexis Price Tracker 2026", "Competitor Product List"])
+        # The sheets come back as lists of rows, so work on them directly
+        existing_rows = existing_data[1:] if len(existing_data) > 1 else None
+        rows = product_data[1:]
         final_data = []
-        headers = df.columns.tolist()
+        headers = list(product_data[0])
         headers.append("Last Fetched At")
         final_data.append(headers)
-        print("Bot: Scraping prices...")
-        
-        for index, row in df.iterrows():
-            row_data = []
-            
-            # Use iloc for safer access
-            brand = str(row.iloc[0])
-            product = str(row.iloc[1])
-            row_data.append(brand) 
-            row_data.append(product) 
-            row_data.append(str(row.iloc[2])) 
-            
-            for col_idx in range(3, len(df.columns)):
-                cell_value = row.iloc[col_idx]
-                col_name = headers[col_idx]
-                
-                if isinstance(cell_value, str) and "http" in cell_value:
-                    print(f"   -> Scraping {product} on {col_name}...")
-                    price = get_price(driver, cell_value, product)
-                    # Keep previous value if scraping failed
-                    print(f"      [Result]: {price}")
-                    if price in ["Blocked by Website", "Out of Stock / Error", "Error", "Timeout"]:
-                        if existing_df is not None and index < len(existing_df):
-                            old_val = existing_df.iloc[index, col_idx]
-                            if old_val not in ["", "Not Available"]:
-                                price = old_val
-                    row_data.append(price)
-                else:
-                    row_data.append("Not Available")
-            row_data.append(fetch_time)
-            final_data.append(row_data)
-
-        print("Bot: Uploading to Google Sheets...")
-        
-      
-        price_sheet = client.open(SHEET_NAME).worksheet("Cimexis Price Tracker 2026")
-        
-        price_sheet.update("A1", final_data)
-        
-        price_sheet.format("A1:Z1", {
-            "backgroundColor": {"red": 0.0, "green": 0.2, "blue": 0.6},
-            "textFormat": {"foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}, "bold": True}
-        })
-        price_sheet.format("A2:C100", {
-            "backgroundColor": {"red": 0.95, "green": 0.95, "blue": 0.95}
-        })
-        
-        print("Bot: Success! Prices updated.")
-                # ==========================================
-        # COMPETITOR SCRAPE FROM SAME EXCEL
-        # ==========================================
-        print("Bot: Starting competitor scraping...")
-
-
-        competitor_sheet = client.open(SHEET_NAME).worksheet("Competitor Product List")
-        comp_data = competitor_sheet.get_all_values()
-
-        comp_df = pd.DataFrame(comp_data[1:], columns=comp_data[0])
-        comp_df = comp_df.ffill()
-
-        output_df = comp_df.copy()
-
-        for index, row in comp_df.iterrows():
-
-            # AMAZON
-            amazon_url = str(row.iloc[4])
-            if "http" in amazon_url:
-                print(f"Scraping Amazon competitor: {row.iloc[2]}")
-                price = get_price(driver, amazon_url, row.iloc[2])
-                output_df.iat[index,4] = price
+        comp_rows = comp_data[1:]
+        logger.info("Scraping prices")
+
+        # Every (row, column) that holds a link, found in a single pass
+        links = [(index, col_idx) for index, row in enumerate(rows)
+                 for col_idx in range(3, len(row)) if "http" in row[col_idx]]
+        comp_links = [(index, url_col, name_col, platform) for index, row in enumerate(comp_rows)
+                      for url_col, name_col, platform in COMPETITOR_COLUMNS if "http" in row[url_col]]
+
+        # Both sheets are scraped in one pass so all pages are fetched together
+        jobs = [(rows[index][col_idx], rows[index][1]) for index, col_idx in links]
+        jobs += [(comp_rows[index][url_col], comp_rows[index][name_col]) for index, url_col, name_col, _ in comp_links]
+        prices = scrape_prices(drivers, jobs, force)
+
+        # Start every row as "Not Available" and fill in the scraped cells
+        for row in rows:
+            final_data.append([row[0], row[1], row[2]] + ["Not Available"] * (len(row) - 3) + [fetch_time])
+
+        for index, col_idx in links:
+            price = prices[rows[index][col_idx]]
+            # Keep previous value if scraping failed
+            logger.info("%s on %s: %s", rows[index][1], headers[col_idx], price)
+            if price in FAILED_PRICES:
+                if existing_rows is not None and index < len(existing_rows):
+                    old_val = existing_rows[index][col_idx]
+                    if old_val not in EMPTY_CELLS:
+                        price = old_val
+            final_data[index + 1][col_idx] = price
 
-            # FLIPKART
-            flipkart_url = str(row.iloc[7])
-            if "http" in flipkart_url:
-                print(f"Scraping Flipkart competitor: {row.iloc[5]}")
-                price = get_price(driver, flipkart_url, row.iloc[5])
-                output_df.iat[index,7] = price
-
-            # BLINKIT
-            blinkit_url = str(row.iloc[10])
-            if "http" in blinkit_url:
-                print(f"Scraping Blinkit competitor: {row.iloc[8]}")
-                price = get_price(driver, blinkit_url, row.iloc[8])
-                output_df.iat[index,10] = price
-
-            # OTHERS
-            others_url = str(row.iloc[13])
-            if "http" in others_url:
-                print(f"Scraping other competitor: {row.iloc[11]}")
-                price = get_price(driver, blinkit_url, row.iloc[11])
-                output_df.iat[index,13] = price
-        print("Bot: Uploading competitor prices...")
-
-        try:
-            comp_sheet = client.open(SHEET_NAME).worksheet("Competitor Prices")
-        except:
-            comp_sheet = client.open(SHEET_NAME).add_worksheet(
+        # ==========================================
+        # COMPETITOR PRICES FROM SAME EXCEL
+        # ==========================================
+        output_rows = [list(row) for row in comp_rows]
+        for index, url_col, name_col, platform in comp_links:
+            price = prices[comp_rows[index][url_col]]
+            logger.info("%s competitor %s: %s", platform, comp_rows[index][name_col], price)
+            output_rows[index][url_col] = price
+        final_output = [comp_data[0]] + output_rows
+
+        logger.info("Uploading to Google Sheets")
+
+        comp_sheet = sheets.get("Competitor Prices")
+        if comp_sheet is None:
+            comp_sheet = spreadsheet.add_worksheet(
                 title="Competitor Prices",
                 rows="2000",
                 cols="20"
             )
 
-        final_output = [comp_df.columns.tolist()] + output_df.values.tolist()
-
-        comp_sheet.clear()
-        comp_sheet.update("A1", final_output)
+        # One batchUpdate clears the old competitor prices and applies both
+        # formats, then one values.batchUpdate writes both tabs.
+        spreadsheet.batch_update({"requests": [
+            clear_request(comp_sheet),
+            format_request(price_sheet, "A1:Z1", HEADER_FORMAT),
+            format_request(price_sheet, "A2:C100", PRODUCT_FORMAT),
+        ]})
+        write_values(spreadsheet, [(price_sheet, final_data), (comp_sheet, final_output)])
 
+        logger.info("Success! Prices updated.")
 
     except Exception as e:
-     print(f"Fatal Error: {e}")
+     logger.error("Fatal Error: %s", e)
 
 
     finally:
-        driver.quit()
+        if keep_driver:
+            _drivers = drivers
+        else:
+            drivers.quit()
+            _drivers = None
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape product prices into Google Sheets.")
+    parser.add_argument("--force", action="store_true", help="ignore cached prices and scrape every page")
+    args = parser.parse_args()
+    main(force=args.force)
\ No newline at end of file